@@ -1,22 +1,60 @@
 #!/usr/bin/env python3
 # main.py - EVDS yeni sürüme uyumlu, güncelleme + skip destekli + hata loglama
 
+import io
+import json
 import os
+import queue
+import mmap
 import re
+import ssl
 import sys
+import sqlite3
 import time
+import asyncio
+import threading
+import functools
+import httpx
 import requests
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from evds import evdsAPI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # orjson yoksa standart json ile devam edilir
+    json_loads = json.loads
 
 # ---------- AYARLAR ----------
 API_KEY = os.getenv("EVDS_API_KEY")
 DATA_DIR = "data"
 LOG_DIR = "logs"
-SLEEP_BETWEEN_SERIES = 1
+STATE_DIR = "state"
+CATALOG_DB = os.path.join(STATE_DIR, "catalog.sqlite")
+CATALOG_TTL = 7 * 86400  # Kategori ve seri listeleri önbellekte 1 hafta tutulur (güncelleme modunda seri listeleri FETCH_TTL)
+STATE_DB = os.path.join(STATE_DIR, "state.sqlite")
+FETCH_TTL = 6 * 3600     # Güncelleme modunda son 6 saatte çekilmiş seriler tekrar istenmez
+EVDS_URL = "https://evds3.tcmb.gov.tr/igmevdsms-dis/"
+MAX_CONCURRENCY = 8        # Aynı anda açık tutulan en fazla veri isteği
+REQUESTS_PER_SECOND = 1    # API anahtarı başına saniyelik istek kotası (429'larda geçici olarak düşürülür)
+RATE_LIMIT_BACKOFF = 5     # Retry-After başlığı olmayan 429'larda ilk bekleme (sn), her denemede ikiye katlanır
+RATE_LIMIT_MAX_BACKOFF = 120
+BATCH_SIZE = 20            # Tek istekte çekilen en fazla seri kodu
+TRAVERSAL_WORKERS = 8      # Kategori/seri listesi istekleri için thread sayısı
+WRITE_QUEUE_SIZE = 64      # Yazıcı thread'i bekleyen en fazla alt kategori sonucu
+REQUEST_TIMEOUT = 30
 UPDATE_MODE = "--update" in sys.argv
 UPDATE_DAYS = 3  # Güncelleme modunda son X gün
+CSV_DATE_FORMAT = "%Y-%m-%d"  # CSV'ler ISO tarihle yazılır; kuyruk taraması bu sıralamaya dayanır
+REFRESH_CATALOG = "--refresh-catalog" in sys.argv
 # -----------------------------
 
 if not API_KEY:
@@ -24,7 +62,243 @@ if not API_KEY:
 
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(LOG_DIR, exist_ok=True)
+os.makedirs(STATE_DIR, exist_ok=True)
+
+# ---------- HTTP OTURUMU ----------
+
+def legacy_ssl_context():
+    """evds kütüphanesiyle aynı şekilde eski TLS yeniden anlaşmasına izin veren SSL context."""
+    ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
+    return ctx
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """Bağlantı havuzunu verilen SSL context ile kuran HTTPAdapter."""
+
+    def __init__(self, ssl_context=None, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+class KeepAliveSession(requests.Session):
+    """evdsAPI her istekten sonra session.close() çağırır; burada havuz açık kalır."""
+
+    def close(self):
+        pass
+
+def pooled_session():
+    """Kategori/seri listesi istekleri için keep-alive ve retry destekli oturum."""
+    session = KeepAliveSession()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        respect_retry_after_header=True,
+    )
+    adapter = PooledHTTPAdapter(
+        legacy_ssl_context(), pool_connections=16, pool_maxsize=32, max_retries=retry
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
 evds = evdsAPI(API_KEY)
+# evdsAPI ilk isteğini (ana kategoriler) kurulumda yapar; sonraki tüm istekler
+# aynı TCP+TLS bağlantısını yeniden kullanır.
+evds.session = pooled_session()
+
+# ---------- HIZ SINIRLAYICI ----------
+
+# Bu değerden büyük bekleme başlıkları süre değil Unix zamanı (epoch) olarak yorumlanır
+EPOCH_THRESHOLD = 1e9
+
+def header_seconds(headers, name):
+    """Saniye cinsinden sayısal bir başlığı (Retry-After vb.) okur; yoksa veya geçersizse None döner.
+
+    Epoch olarak gönderilen değerler (ör. X-RateLimit-Reset) kalan süreye çevrilir.
+    """
+    try:
+        value = float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+    if value > EPOCH_THRESHOLD:
+        value -= time.time()
+    return max(0.0, value)
+
+class RateLimiter:
+    """Süreç genelinde paylaşılan token bucket; hız 429 ve limit başlıklarına göre uyarlanır."""
+
+    def __init__(self, rate, burst=1, backoff=RATE_LIMIT_BACKOFF, max_backoff=RATE_LIMIT_MAX_BACKOFF):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.burst = burst
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._pauses = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Kovayı şimdiki zamana taşır; duraklatma süresince `_updated` ileride olduğundan token birikmez."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self):
+        """Bir token ayırır; beklenecek süreyi ve o anki duraklatma sayacını döner."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            delay = 0 if self._tokens >= 0 else -self._tokens / self.rate
+            return delay, self._pauses
+
+    def _pause(self, seconds):
+        """Kovanın zaman çizgisini duraklatma sonuna taşır; sonraki istekler oradan `rate` aralıkla çıkar.
+
+        Duraklatmadan önce ayrılmış token'lar (borç) silinir: onları bekleyen istekler uyanınca
+        sayacın değiştiğini görüp sıralarını yeni zaman çizgisinde yeniden alır.
+        Süre `max_backoff` ile sınırlanır.
+        """
+        seconds = min(seconds, self.max_backoff)
+        until = time.monotonic() + seconds
+        if until <= self._paused_until:
+            return
+        self._tokens = 0
+        self._updated = until
+        self._paused_until = until
+        self._pauses += 1
+
+    def observe(self, status, headers, attempt=0):
+        """Yanıtın durum kodu ve limit başlıklarına göre hızı ayarlar; 429'da bekleme süresini döner."""
+        retry_after = header_seconds(headers, "Retry-After")
+        with self._lock:
+            self._refill()
+            if status == 429:
+                self.rate = max(self.min_rate, self.rate / 2)
+                if retry_after is None:
+                    retry_after = self.backoff * 2 ** attempt
+                retry_after = min(self.max_backoff, retry_after)
+                self._pause(retry_after)
+                return retry_after
+
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 8)
+            if header_seconds(headers, "X-RateLimit-Remaining") == 0:
+                reset = retry_after if retry_after is not None else header_seconds(headers, "X-RateLimit-Reset")
+                self._pause(reset if reset is not None else 1 / self.rate)
+            return 0
+
+    async def wait(self):
+        delay, pauses = self._reserve()
+        while delay:
+            await asyncio.sleep(delay)
+            # Beklerken kova duraklatıldıysa (429) ayrılan sıra geçersizdir; sıra yeniden alınır
+            if self._pauses == pauses:
+                return
+            delay, pauses = self._reserve()
+
+    def wait_sync(self):
+        delay, pauses = self._reserve()
+        while delay:
+            time.sleep(delay)
+            if self._pauses == pauses:
+                return
+            delay, pauses = self._reserve()
+
+limiter = RateLimiter(REQUESTS_PER_SECOND)
+
+def observe_response(r, *args, **kwargs):
+    """requests yanıt kancası: kategori/seri listesi yanıtlarının limit başlıkları da kovayı günceller."""
+    limiter.observe(r.status_code, r.headers)
+
+evds.session.hooks["response"].append(observe_response)
+
+# ---------- KATALOG ÖNBELLEĞİ ----------
+
+with closing(sqlite3.connect(CATALOG_DB)) as _conn, _conn:
+    _conn.execute(
+        "CREATE TABLE IF NOT EXISTS catalog (key TEXT PRIMARY KEY, fetched_at REAL, payload TEXT)"
+    )
+
+def cached_catalog(ttl=CATALOG_TTL):
+    """Kategori/seri listesi dönen safe_get_* fonksiyonlarını `ttl` saniye süresince catalog.sqlite'ta önbelleğe alır."""
+    def decorator(func):
+        def to_frame(payload, fetched_at):
+            df = pd.DataFrame(json_loads(payload))
+            text_cols = df.select_dtypes(exclude="number").columns
+            df[text_cols] = df[text_cols].astype(object).where(df[text_cols].notna(), None)
+            df.attrs["fetched_at"] = fetched_at
+            return df
+
+        @functools.wraps(func)
+        def wrapper(arg):
+            key = f"{func.__name__}:{arg}"
+            with closing(sqlite3.connect(CATALOG_DB)) as conn:
+                row = conn.execute("SELECT fetched_at, payload FROM catalog WHERE key = ?", (key,)).fetchone()
+            if row and not REFRESH_CATALOG and time.time() - row[0] < ttl:
+                return to_frame(row[1], row[0])
+
+            df = func(arg)
+            if df is None or df.empty:
+                return df
+            fetched_at = time.time()
+            payload = df.to_json(orient="records")
+            with closing(sqlite3.connect(CATALOG_DB)) as conn, conn:
+                conn.execute("INSERT OR REPLACE INTO catalog VALUES (?, ?, ?)", (key, fetched_at, payload))
+            return to_frame(payload, fetched_at)
+        return wrapper
+    return decorator
+
+# ---------- SERİ DURUMU ----------
+
+with closing(sqlite3.connect(STATE_DB)) as _conn, _conn:
+    _conn.execute(
+        "CREATE TABLE IF NOT EXISTS series_state (code TEXT PRIMARY KEY, last_ts REAL, last_tarih TEXT)"
+    )
+
+# Seri listesinde sunucu tarafının son veri tarihini taşıyan sütunlar (öncelik sırasıyla)
+SERIES_STAMP_COLUMNS = ("LAST_UPDATE_DATE", "END_DATE")
+
+def load_series_state():
+    """state.sqlite'taki kayıtları {kod: (son çekim zamanı, sunucudaki son tarih)} olarak döner."""
+    with closing(sqlite3.connect(STATE_DB)) as conn:
+        rows = conn.execute("SELECT code, last_ts, last_tarih FROM series_state").fetchall()
+    return {code: (last_ts, last_tarih) for code, last_ts, last_tarih in rows}
+
+def save_series_state(rows):
+    """(kod, çekim zamanı, sunucudaki son tarih) kayıtlarını state.sqlite'a yazar."""
+    if not rows:
+        return
+    with closing(sqlite3.connect(STATE_DB)) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO series_state VALUES (?, ?, ?)", rows)
+
+def series_stamp(serie):
+    """Seri listesi satırından sunucunun bildirdiği son veri tarihini döner (yoksa None)."""
+    for col in SERIES_STAMP_COLUMNS:
+        value = getattr(serie, col, None)
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+def is_up_to_date(code, stamp, catalog_ts, state):
+    """Seri son FETCH_TTL içinde çekildiyse ya da son çekimden sonra ve son FETCH_TTL içinde
+    alınan seri listesinde sunucudaki son tarihi değişmediyse True döner."""
+    if code not in state:
+        return False
+    last_ts, last_tarih = state[code]
+    now = time.time()
+    if now - last_ts < FETCH_TTL:
+        return True
+    return (
+        stamp is not None and stamp == last_tarih
+        and catalog_ts > last_ts and now - catalog_ts < FETCH_TTL
+    )
 
 # ---------- FONKSİYONLAR ----------
 
@@ -42,160 +316,564 @@ def safe_get_main_categories():
         print(f"⚠️ main_categories hata: {e}")
         return None
 
+@cached_catalog()
 def safe_get_sub_categories(cat_id):
     try:
+        limiter.wait_sync()
         return evds.get_sub_categories(cat_id)
     except Exception as e:
         print(f"⚠️ get_sub_categories hata (CATEGORY_ID={cat_id}): {e}")
         return None
 
+# Güncelleme modunda seri listesindeki son veri tarihleri is_up_to_date için tazeliğini korumalı
+@cached_catalog(FETCH_TTL if UPDATE_MODE else CATALOG_TTL)
 def safe_get_series(datagroup_code):
     try:
-        return evds.get_series(datagroup_code)
+        limiter.wait_sync()
+        return evds.get_series(datagroup_code, detail=True)
     except Exception as e:
         print(f"⚠️ get_series hata (DATAGROUP_CODE={datagroup_code}): {e}")
         return None
 
-def safe_get_data(code, serie_name=None, category=None, retries=3, delay=5):
-    """EVDS'ten veri çeker, bağlantı hatalarında tekrar dener."""
+def get_date_range():
+    """Çalışma moduna göre (başlangıç, bitiş) tarihlerini EVDS formatında döner."""
+    end = datetime.now()
+    if UPDATE_MODE:
+        start = end - timedelta(days=UPDATE_DAYS)
+        return start.strftime("%d-%m-%Y"), end.strftime("%d-%m-%Y")
+    return "01-01-2000", end.strftime("%d-%m-%Y")
+
+def items_to_df(items, codes):
+    """EVDS JSON `items` listesini evds.get_data ile aynı biçimde DataFrame'e çevirir.
+
+    DataFrame satır kayıtlarından değil sütun sözlüğünden kurulur: seri sütunları
+    doğrudan float64 olarak oluşturulur, UNIXTIME sütunu hiç kurulmaz.
+    """
+    keys = dict.fromkeys(key for item in items for key in item)
+    keys.pop("UNIXTIME", None)
+    serie_cols = {c.replace(".", "_") for c in codes}
+    columns = {}
+    for key in keys:
+        values = [item.get(key) for item in items]
+        columns[key] = pd.Series(values, dtype="float64") if key in serie_cols else values
+    return pd.DataFrame(columns)
+
+async def safe_get_data(client, sem, codes, date_range, serie_name=None, category=None,
+                        retries=3, delay=5, log_failure=True):
+    """EVDS'ten bir veya birden fazla serinin verisini tek istekte çeker, bağlantı hatalarında tekrar dener.
+
+    (DataFrame, HTTP durum kodu) döner. Başarısız olursa DataFrame None'dır; durum kodu
+    son alınan yanıtınkidir, hiç yanıt alınamadıysa (bağlantı hatası) None'dır.
+    """
+    start_str, end_str = date_range
+    status = None
+    code = "-".join(codes)
+    url = f"{EVDS_URL}series={code}&startDate={start_str}&endDate={end_str}&type=json"
     for attempt in range(retries):
         try:
-            if UPDATE_MODE:
-                end = datetime.now()
-                start = end - timedelta(days=UPDATE_DAYS)
-                start_str = start.strftime("%d-%m-%Y")
-                end_str = end.strftime("%d-%m-%Y")
-                print(f"      ↪ Güncelleme aralığı: {start_str} → {end_str}")
-            else:
-                start_str = "01-01-2000"
-                end_str = datetime.now().strftime("%d-%m-%Y")
-
-            return evds.get_data([code], startdate=start_str, enddate=end_str)
-
-        except requests.exceptions.ConnectionError as e:
+            async with sem:
+                await limiter.wait()
+                r = await client.get(url, headers={"key": API_KEY})
+
+            status = r.status_code
+            wait = limiter.observe(status, r.headers, attempt)
+            if r.status_code == 429:
+                # Bekleme kovada uygulanır; diğer istekler de aynı süre durur
+                print(f"⚠️ API limitine ulaşıldı, {wait:g} sn bekleniyor (hız: {limiter.rate:.2f} istek/sn)...")
+                continue
+            if r.status_code != 200:
+                print(f"⚠️ get_data hata ({code}): HTTP {r.status_code}")
+                break
+            return items_to_df(json_loads(r.content)["items"], codes), status
+
+        except httpx.TransportError as e:
             print(f"⚠️ Bağlantı hatası ({code}), {attempt+1}. deneme: {e}")
-            time.sleep(delay)
+            await asyncio.sleep(delay)
 
         except Exception as e:
-            if "Too Many Requests" in str(e):
-                print("⚠️ API limitine ulaşıldı, 60 sn bekleniyor...")
-                time.sleep(60)
-                continue
             print(f"⚠️ get_data hata ({code}): {e}")
             break
 
     print(f"❌ {code}: {retries} denemede veri alınamadı.")
-    log_failed_series(code, serie_name or "Bilinmiyor", category or "Bilinmiyor", "ConnectionError veya boş veri")
+    if log_failure:
+        log_failed_series(code, serie_name or "Bilinmiyor", category or "Bilinmiyor", "ConnectionError veya boş veri")
+    return None, status
+
+def make_batches(series_df):
+    """Serileri frekanslarına göre gruplayıp BATCH_SIZE'lık (seri adı, kod) listelerine böler.
+
+    Aynı veri grubundaki ve aynı frekanstaki seriler ortak tarih eksenini paylaşır;
+    bu yüzden tek istekte çekilip sütun sütun ayrılabilir.
+    """
+    groups = {}
+    for s in series_df.itertuples():
+        code = getattr(s, "SERIE_CODE", None)
+        if not code:
+            continue
+        serie_name = getattr(s, "SERIE_NAME", "Bilinmiyor")
+        groups.setdefault(getattr(s, "FREQUENCY_STR", None), []).append((serie_name, code))
+
+    return [
+        group[i:i + BATCH_SIZE]
+        for group in groups.values()
+        for i in range(0, len(group), BATCH_SIZE)
+    ]
+
+async def fetch_batch(client, sem, batch, date_range, category):
+    """Bir grup seriyi tek istekte çeker; istek geçersiz bir kod yüzünden reddedilirse seriler tek tek denenir.
+
+    Çekilen seriler için {kod: normalize edilmiş DataFrame (veri yoksa None)} döner;
+    hiç çekilemeyen seriler sözlükte yer almaz.
+    """
+    codes = [code for _, code in batch]
+    if len(batch) > 1:
+        df, status = await safe_get_data(client, sem, codes, date_range, category=category, log_failure=False)
+        if df is not None:
+            return normalize_batch(df, codes)
+        # Yalnızca istemci hatasında (429 dışındaki 4xx, ör. geçersiz kod) bölünür; limit ve
+        # bağlantı hatalarında bölmek zaten kısıtlayan API'ye BATCH_SIZE kat istek gönderir.
+        if status is None or status == 429 or not 400 <= status < 500:
+            for serie_name, code in batch:
+                log_failed_series(code, serie_name, category, f"Toplu istek başarısız (HTTP {status or '-'})")
+            return {}
+        print(f"↪ Toplu istek başarısız, {len(batch)} seri tek tek deneniyor...")
+
+    results = await asyncio.gather(*(
+        safe_get_data(client, sem, [code], date_range, serie_name=serie_name, category=category)
+        for serie_name, code in batch
+    ))
+    return {code: normalize_df(df_raw, code) for code, (df_raw, _) in zip(codes, results) if df_raw is not None}
+
+# EVDS tarih biçimleri: günlük/haftalık "19-10-2025", aylık "2025-10" (veya "2025-1"), yıllık "2025"
+DATE_FORMATS = (
+    (re.compile(r"\d{2}-\d{2}-\d{4}$"), "%d-%m-%Y"),
+    (re.compile(r"\d{4}-\d{1,2}$"), "%Y-%m"),
+    (re.compile(r"\d{4}$"), "%Y"),
+)
+
+def detect_date_format(sample):
+    """Tarih biçimini örnek değerden tespit eder; tanınmayan biçimlerde (ör. çeyreklik) None döner."""
+    for pattern, fmt in DATE_FORMATS:
+        if pattern.match(sample):
+            return fmt
     return None
 
-def normalize_df(df, code):
-    if df is None or df.empty:
-        return None
+def parse_dates(df, label):
+    """Tarih sütununu bulup datetime'a çevirir ve geçersiz tarihli satırları atar.
 
+    Biçim DataFrame başına bir kez belirlenir; format= ile vektörel ayrıştırıcı kullanılır.
+    Tarih zaten datetime ise yeniden ayrıştırılmaz.
+    """
     if "Tarih" not in df.columns and "DATE" in df.columns:
         df = df.rename(columns={"DATE": "Tarih"})
     if "Tarih" not in df.columns:
-        print(f"⚠️ {code}: Tarih sütunu yok.")
+        print(f"⚠️ {label}: Tarih sütunu yok.")
         return None
 
-    df["Tarih"] = pd.to_datetime(df["Tarih"], dayfirst=True, errors="coerce")
-    df = df.dropna(subset=["Tarih"])
+    if not pd.api.types.is_datetime64_any_dtype(df["Tarih"]):
+        fmt = detect_date_format(str(df["Tarih"].iat[0]))
+        if fmt:
+            df["Tarih"] = pd.to_datetime(df["Tarih"], format=fmt, errors="coerce", cache=True)
+        else:
+            df["Tarih"] = pd.to_datetime(df["Tarih"], dayfirst=True, errors="coerce")
+    return df.dropna(subset=["Tarih"])
 
-    other_cols = [c for c in df.columns if c != "Tarih"]
-    if not other_cols:
+def normalize_df(df, code):
+    if df is None or df.empty:
+        return None
+
+    safe_code = code.replace(".", "_")
+    df = parse_dates(df, code)
+    if df is None:
+        return None
+
+    cols = df.columns
+    if safe_code in cols:
+        return df[["Tarih", safe_code]]
+    if len(cols) < 2:
         print(f"⚠️ {code}: Veri sütunu bulunamadı.")
         return None
 
-    series_col = other_cols[0]
-    df = df.rename(columns={series_col: code.replace(".", "_")})
-    return df[["Tarih", code.replace(".", "_")]]
+    # EVDS yanıtı (UNIXTIME atıldıktan sonra) Tarih + değer sütunundan oluşur; değer konumla alınır
+    col_idx = 1 if cols[0] == "Tarih" else 0
+    df = df.iloc[:, [cols.get_loc("Tarih"), col_idx]]
+    return df.set_axis(["Tarih", safe_code], axis=1)
+
+def normalize_batch(df, codes):
+    """Toplu yanıttaki geniş tabloyu tek geçişte normalize edip {kod: DataFrame (sütunu yoksa None)} sözlüğüne böler."""
+    if df.empty:
+        return dict.fromkeys(codes)
+    df = parse_dates(df, "-".join(codes))
+    if df is None:
+        return dict.fromkeys(codes)
+
+    frames = {}
+    for code in codes:
+        safe_code = code.replace(".", "_")
+        if safe_code in df.columns:
+            frames[code] = df[["Tarih", safe_code]]
+        else:
+            print(f"⚠️ {code}: Toplu yanıtta seri sütunu bulunamadı.")
+            frames[code] = None
+    return frames
+
+# Dosya/klasör isimlerinden silinecek karakterler için str.translate tablosu
+_BAD_FILENAME_CHARS = str.maketrans("", "", '\\/*?:"<>|')
 
 def clean_filename(name):
     """Dosya veya klasör isimlerinde sorun çıkaracak karakterleri temizler"""
-    return re.sub(r'[\\/*?:"<>|]', "", str(name))
-
-def append_or_create_csv(series_name, df, main_category, sub_category):
-    """CSV dosyasını klasör yapısına göre kaydeder veya günceller"""
-    main_dir = os.path.join(DATA_DIR, clean_filename(main_category))
-    sub_dir = os.path.join(main_dir, clean_filename(sub_category))
-    os.makedirs(sub_dir, exist_ok=True)
-
+    return str(name).translate(_BAD_FILENAME_CHARS)
+
+def find_tail_offset(f, since):
+    """İkili modda açık, tarihe göre sıralı CSV'de Tarih >= `since` olan ilk satırın bayt ofsetini bulur.
+
+    Dosya mmap ile açılıp satır satır sondan başa taranır; yalnızca kuyruğun düştüğü
+    sayfalar diskten okunur. `since` ISO formatında bayt dizisidir (ör. b"2025-10-18").
+    Sonu satır sonuyla bitmeyen son satır her zaman kuyruğa dahildir.
+    """
+    f.seek(0)
+    header_end = len(f.readline())
+    size = f.seek(0, os.SEEK_END)
+    if size <= header_end:
+        return header_end
+
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = mm.rfind(b"\n", header_end - 1, size) + 1
+        while end > header_end:
+            nl = mm.rfind(b"\n", header_end, end - 1)
+            start = nl + 1 if nl != -1 else header_end
+            comma = mm.find(b",", start, end)
+            if mm[start:comma if comma != -1 else end - 1] < since:
+                return end
+            end = start
+    return header_end
+
+def read_csv_tail(header, tail, tarih_dtype):
+    """Başlık + kuyruk baytlarını PyArrow ile açık sütun tipleriyle okur.
+
+    Tarih timestamp, diğer sütunlar float64 olarak okunur; tip çıkarımı ve değer başına
+    Python nesnesi oluşturulması yapılmaz. Tarih, yeni veriyle aynı dtype'a çevrilir.
+    """
+    columns = header.decode("utf-8").strip().split(",")
+    column_types = {c: pa.float64() for c in columns}
+    column_types["Tarih"] = pa.timestamp("ns")
+    table = pacsv.read_csv(
+        io.BytesIO(header + tail),
+        read_options=pacsv.ReadOptions(use_threads=False),
+        convert_options=pacsv.ConvertOptions(column_types=column_types),
+    )
+    old = table.to_pandas()
+    if old["Tarih"].dtype != tarih_dtype:
+        old["Tarih"] = old["Tarih"].astype(tarih_dtype)
+    return old
+
+def write_csv(df, fname, mode="xb", eol=os.linesep):
+    """DataFrame'i PyArrow ile DataFrame.to_csv biçiminde yazar; "ab" kipinde başlık yazılmaz."""
+    columns = {}
+    for col in df.columns:
+        if col == "Tarih":
+            columns[col] = pa.Array.from_pandas(df[col]).cast(pa.date32(), safe=False)
+        else:
+            values = df[col].to_numpy(dtype="float64")
+            columns[col] = pa.array(values.astype(str), mask=np.isnan(values))
+    table = pa.table(columns)
+
+    # WriteOptions(eol=) eski PyArrow sürümlerinde yok; satırlar "\n" ile yazılıp gerekirse çevrilir
+    buf = io.BytesIO()
+    pacsv.write_csv(table, buf, write_options=pacsv.WriteOptions(include_header=False, quoting_style="none"))
+    rows = buf.getvalue()
+    if eol != "\n":
+        rows = rows.replace(b"\n", eol.encode())
+
+    with open(fname, mode) as f:
+        if mode != "ab":
+            f.write((",".join(table.column_names) + eol).encode("utf-8"))
+        f.write(rows)
+
+def merge_sorted(old, new):
+    """Tarihe göre sıralı `old` ile `new` satırlarını birleştirir; aynı tarihte yeni değer kazanır.
+
+    Sıralılık değişmezi sayesinde tam sıralama yapılmaz: np.searchsorted ile her yeni
+    tarihin yeri bulunur, çakışan tarihler yerinde güncellenir, kalanlar np.insert ile eklenir.
+    """
+    if list(old.columns) != list(new.columns):
+        raise ValueError(f"Sütunlar uyuşmuyor: mevcut {list(old.columns)}, yeni {list(new.columns)}")
+    if not new["Tarih"].is_monotonic_increasing or not new["Tarih"].is_unique:
+        new = new.sort_values("Tarih", kind="stable").drop_duplicates(subset=["Tarih"], keep="last")
+
+    old_dates = old["Tarih"].to_numpy()
+    new_dates = new["Tarih"].to_numpy()
+    pos = np.searchsorted(old_dates, new_dates)
+    hit = pos < len(old_dates)
+    hit[hit] = old_dates[pos[hit]] == new_dates[hit]
+    ins = ~hit
+
+    merged = {"Tarih": np.insert(old_dates, pos[ins], new_dates[ins])}
+    for col in old.columns.drop("Tarih"):
+        values = old[col].to_numpy(dtype="float64", copy=True)
+        new_values = new[col].to_numpy(dtype="float64")
+        values[pos[hit]] = new_values[hit]
+        merged[col] = np.insert(values, pos[ins], new_values[ins])
+    return pd.DataFrame(merged)
+
+def series_path(series_name, main_category, sub_category):
+    """Serinin CSV yolunu klasör yapısına göre döner: data/<ana kategori>/<alt kategori>/<seri>.csv"""
+    sub_dir = os.path.join(DATA_DIR, clean_filename(main_category), clean_filename(sub_category))
     fname = os.path.join(sub_dir, f"{clean_filename(series_name)}.csv")
     # Uzun yol desteği (Windows)
     if os.name == "nt":
         fname = "\\\\?\\" + os.path.abspath(fname)
+    return sub_dir, fname
 
-    # 🚀 Skip kontrolü: Dosya zaten varsa ve update modunda değilsek, atla
-    if os.path.exists(fname) and not UPDATE_MODE:
-        print(f"    ⏭️ {series_name}: zaten mevcut, atlanıyor.")
-        return
+# Bu çalışmada oluşturulmuş klasörler; yalnızca yazıcı thread'i kullanır
+_made_dirs = set()
+
+def append_or_create_csv(series_name, df, main_category, sub_category):
+    """CSV dosyasını klasör yapısına göre kaydeder veya günceller"""
+    sub_dir, fname = series_path(series_name, main_category, sub_category)
+    if sub_dir not in _made_dirs:
+        os.makedirs(sub_dir, exist_ok=True)
+        _made_dirs.add(sub_dir)
 
     if df is None or df.empty:
         print(f"    ⛔ {series_name}: yeni veri yok.")
         return
 
-    if not os.path.exists(fname):
-        df.to_csv(fname, index=False, encoding="utf-8")
+    # Dosyanın varlığı ayrıca sorgulanmaz: oluşturma "x" kipiyle denenir, dosya varsa hata döner
+    try:
+        write_csv(df, fname)
         print(f"    ✅ Oluşturuldu: {fname} ({len(df)} satır)")
         return
+    except FileExistsError:
+        pass
+
+    # Yalnızca yeni verinin çakıştığı kuyruk okunur ve yeniden yazılır.
+    with open(fname, "rb") as f:
+        header = f.readline()
+        # Başlık satırı tamamlanmamışsa (boş dosya, yarıda kesilmiş oluşturma) dosya baştan yazılır.
+        has_header = header.endswith(b"\n")
+        # Mevcut dosyanın satır sonu korunur (Windows'ta yazılmış dosyalar CRLF olabilir)
+        eol = "\r\n" if header.endswith(b"\r\n") else "\n"
+        if has_header and UPDATE_MODE:
+            offset = find_tail_offset(f, df["Tarih"].min().strftime(CSV_DATE_FORMAT).encode())
+            # Tüm yeni tarihler dosyadaki son tarihten sonraysa (güncellemelerde olağan durum)
+            # kuyruk okunmadan, karşılaştırma yapılmadan doğrudan sona eklenir.
+            strict_append = (
+                offset == f.seek(0, os.SEEK_END)
+                and df["Tarih"].is_monotonic_increasing
+                and df["Tarih"].is_unique
+            )
+            if not strict_append:
+                f.seek(offset)
+                tail = f.read()
+
+    if not has_header:
+        write_csv(df, fname, "wb")
+        print(f"    ✅ Oluşturuldu: {fname} ({len(df)} satır)")
+        return
+
+    # 🚀 Skip kontrolü: Dosya zaten varsa ve update modunda değilsek, atla
+    if not UPDATE_MODE:
+        print(f"    ⏭️ {series_name}: zaten mevcut, atlanıyor.")
+        return
 
-    old = pd.read_csv(fname, parse_dates=["Tarih"], dayfirst=True)
-    combined = pd.concat([old, df], ignore_index=True)
-    combined["Tarih"] = pd.to_datetime(combined["Tarih"], dayfirst=True, errors="coerce")
-    combined = (
-        combined.dropna(subset=["Tarih"])
-        .sort_values("Tarih")
-        .drop_duplicates(subset=["Tarih"], keep="last")
-        .reset_index(drop=True)
+    # Başlık yeni sütunlarla uyuşmuyorsa (ör. aynı adlı iki seri tek dosyaya düşüyor) satırlar
+    # yanlış sütun altına eklenmez; hata write_sub_category'de loglanır.
+    columns = header.decode("utf-8").strip().split(",")
+    if columns != list(df.columns):
+        raise ValueError(f"CSV başlığı {columns} yeni veri sütunlarıyla {list(df.columns)} uyuşmuyor")
+
+    if strict_append:
+        write_csv(df, fname, "ab", eol)
+        print(f"    ➕ Eklendi: {fname} ({len(df)} yeni satır)")
+        return
+
+    old = read_csv_tail(header, tail, df["Tarih"].dtype)
+
+    # Çakışan tarihlerde değer değişmediyse yalnızca gerçekten yeni tarihler eklenir (O(Δ)).
+    old_idx = old.set_index("Tarih")
+    new_idx = df.set_index("Tarih")
+    overlap = new_idx.index.intersection(old_idx.index)
+    delta = df[~df["Tarih"].isin(old["Tarih"].values)]
+    unchanged = overlap.empty or old_idx.loc[overlap].equals(new_idx.loc[overlap])
+    # Son satırı satır sonuyla bitmeyen dosyaya ekleme yapılmaz; kuyruk yeniden yazılır.
+    appendable = delta.empty or (
+        (not tail or tail.endswith(b"\n"))
+        and delta["Tarih"].is_monotonic_increasing
+        and delta["Tarih"].is_unique
+        and (old.empty or delta["Tarih"].iat[0] > old["Tarih"].iat[-1])
     )
-    combined.to_csv(fname, index=False, encoding="utf-8")
-    print(f"    🔄 Güncellendi: {fname} (toplam {len(combined)} satır)")
+    if unchanged and appendable:
+        if delta.empty:
+            print(f"    ⏭️ {series_name}: değişiklik yok.")
+            return
+        write_csv(delta, fname, "ab", eol)
+        print(f"    ➕ Eklendi: {fname} ({len(delta)} yeni satır)")
+        return
+
+    combined = merge_sorted(old, df)
+    with open(fname, "r+b") as f:
+        f.truncate(offset)
+    write_csv(combined, fname, "ab", eol)
+    print(f"    🔄 Güncellendi: {fname} (son {len(combined)} satır yeniden yazıldı)")
 
 # ---------- ANA PROGRAM ----------
 
+def collect_series_tasks(main_cats):
+    """Kategori ağacını thread havuzunda gezip düz bir görev listesi kurar.
+
+    Her görev bir alt kategoriye karşılık gelir: (ana kategori, alt kategori, veri grubu kodu, seri listesi).
+    """
+    cats = [
+        (main_cat.CATEGORY_ID, getattr(main_cat, "TOPIC_TITLE_TR", "Bilinmiyor"))
+        for main_cat in main_cats.itertuples()
+    ]
+
+    with ThreadPoolExecutor(max_workers=TRAVERSAL_WORKERS) as ex:
+        subs = []
+        sub_results = ex.map(safe_get_sub_categories, [cat_id for cat_id, _ in cats])
+        for (cat_id, cat_name), sub_cats in zip(cats, sub_results):
+            print(f"🔍 Ana Kategori: {cat_name} (ID: {cat_id})")
+            if sub_cats is None or sub_cats.empty:
+                continue
+            for sub_cat in sub_cats.itertuples():
+                sub_name = getattr(sub_cat, "DATAGROUP_NAME", "Bilinmiyor")
+                subs.append((cat_name, sub_name, sub_cat.DATAGROUP_CODE))
+
+        series_results = ex.map(safe_get_series, [datagroup_code for _, _, datagroup_code in subs])
+        return [
+            (cat_name, sub_name, datagroup_code, series_df)
+            for (cat_name, sub_name, datagroup_code), series_df in zip(subs, series_results)
+            if series_df is not None and not series_df.empty
+        ]
+
+def pending_series(series_df, main_category, sub_category, state):
+    """HTTP isteği gerektiren serileri süzer; atlananları (seri adı, sebep) listesi olarak da döner.
+
+    Full modda CSV'si zaten olan seriler, güncelleme modunda ise state.sqlite'a göre
+    güncel olan seriler hiç istenmez; böylece yarıda kalan çalışmalar kaldığı yerden devam eder.
+    """
+    catalog_ts = series_df.attrs.get("fetched_at", 0)
+    keep, skipped = [], []
+    for s in series_df.itertuples():
+        serie_name = getattr(s, "SERIE_NAME", "Bilinmiyor")
+        if UPDATE_MODE:
+            reason = "güncel" if is_up_to_date(getattr(s, "SERIE_CODE", None), series_stamp(s), catalog_ts, state) else None
+        else:
+            _, fname = series_path(serie_name, main_category, sub_category)
+            try:
+                # Başlık satırı tamamlanmamış dosya (yarıda kesilmiş oluşturma) mevcut sayılmaz, yeniden çekilir
+                with open(fname, "rb") as f:
+                    reason = "zaten mevcut" if f.readline().endswith(b"\n") else None
+            except FileNotFoundError:
+                reason = None
+        keep.append(reason is None)
+        if reason:
+            skipped.append((serie_name, reason))
+    return series_df[keep], skipped
+
+def write_sub_category(cat_name, sub_name, datagroup_code, skipped, series):
+    """Bir alt kategorinin çekilmiş serilerini CSV'lere, çekim kayıtlarını state.sqlite'a yazar.
+
+    `series` (seri adı, kod, DataFrame veya None, çekildi mi, sunucu damgası) listesidir.
+    İstek başarılı olup aralıkta veri dönmeyen seriler de (DataFrame None) çekildi sayılır
+    ve state.sqlite'a işlenir; yalnızca isteği başarısız olanlar işlenmez.
+    """
+    print(f"  ▪ Alt Kategori: {sub_name} (Code: {datagroup_code}) [{cat_name}]")
+    for serie_name, reason in skipped:
+        print(f"    ⏭️ {serie_name}: {reason}, atlanıyor.")
+
+    fetched = []
+    for serie_name, code, df, was_fetched, stamp in series:
+        print(f"    • Seri: {serie_name} ({code})")
+        try:
+            append_or_create_csv(
+                series_name=serie_name,
+                df=df,
+                main_category=cat_name,
+                sub_category=sub_name
+            )
+        except Exception as e:
+            # Bir serinin yazma hatası alt kategorinin kalan serilerini etkilemez
+            print(f"    ❌ Yazma hatası ({serie_name}): {e}")
+            log_failed_series(code, serie_name, sub_name, f"Yazma hatası: {e}")
+            continue
+        if was_fetched:
+            fetched.append((code, time.time(), stamp))
+    save_series_state(fetched)
+
+def writer_loop(q):
+    """Tek yazıcı thread: kuyruktaki alt kategori sonuçlarını geliş sırasıyla diske yazar.
+
+    Tüm CSV ve state.sqlite yazmaları bu thread'de yapıldığından dosya kilidi gerekmez;
+    event loop ise yazma sürerken yeni istekleri göndermeye devam eder. None görünce çıkar.
+    """
+    while True:
+        job = q.get()
+        if job is None:
+            return
+        try:
+            write_sub_category(*job)
+        except Exception as e:
+            print(f"❌ Yazma hatası ({job[1]}): {e}")
+
+async def process_sub_category(client, sem, task, date_range, state, q):
+    """Bir alt kategorinin serilerini toplu isteklerle çekip sonucu yazıcı kuyruğuna bırakır."""
+    cat_name, sub_name, datagroup_code, series_df = task
+
+    stamps = {getattr(s, "SERIE_CODE", None): series_stamp(s) for s in series_df.itertuples()}
+    series_df, skipped = pending_series(series_df, cat_name, sub_name, state)
+    batches = make_batches(series_df)
+    results = await asyncio.gather(*(
+        fetch_batch(client, sem, batch, date_range, sub_name) for batch in batches
+    ))
+
+    series = [
+        (serie_name, code, frames.get(code), code in frames, stamps.get(code))
+        for batch, frames in zip(batches, results)
+        for serie_name, code in batch
+    ]
+    job = (cat_name, sub_name, datagroup_code, skipped, series)
+    try:
+        q.put_nowait(job)
+    except queue.Full:
+        # Yazıcı geride kaldı: event loop'u bloklamadan kuyrukta yer açılmasını bekle
+        await asyncio.to_thread(q.put, job)
+
+async def fetch_all_data(tasks, date_range, state, q):
+    """Tüm alt kategorileri eşzamanlı işler; eşzamanlılık semafor, istek hızı token bucket ile sınırlanır."""
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENCY * 2, max_keepalive_connections=MAX_CONCURRENCY)
+    async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT, verify=legacy_ssl_context()) as client:
+        await asyncio.gather(*(
+            process_sub_category(client, sem, task, date_range, state, q) for task in tasks
+        ))
+
 def fetch_all_series():
     mode = "GÜNCELLEME MODU" if UPDATE_MODE else "FULL MOD"
     print(f"📡 {mode} başlatılıyor...")
 
+    date_range = get_date_range()
+    if UPDATE_MODE:
+        print(f"↪ Güncelleme aralığı: {date_range[0]} → {date_range[1]}")
+
     main_cats = safe_get_main_categories()
     if main_cats is None or main_cats.empty:
         print("⚠️ Ana kategori alınamadı.")
         return
 
-    for main_cat in main_cats.itertuples():
-        cat_id = main_cat.CATEGORY_ID
-        cat_name = getattr(main_cat, "TOPIC_TITLE_TR", "Bilinmiyor")
-        print(f"\n🔍 Ana Kategori: {cat_name} (ID: {cat_id})")
-
-        sub_cats = safe_get_sub_categories(cat_id)
-        if sub_cats is None or sub_cats.empty:
-            continue
-
-        for sub_cat in sub_cats.itertuples():
-            datagroup_code = sub_cat.DATAGROUP_CODE
-            sub_name = getattr(sub_cat, "DATAGROUP_NAME", "Bilinmiyor")
-            print(f"  ▪ Alt Kategori: {sub_name} (Code: {datagroup_code})")
-
-            series_df = safe_get_series(datagroup_code)
-            if series_df is None or series_df.empty:
-                continue
+    tasks = collect_series_tasks(main_cats)
+    total = sum(len(series_df) for *_, series_df in tasks)
+    print(f"\n📋 {len(tasks)} alt kategori, {total} seri bulundu.\n")
 
-            for s in series_df.itertuples():
-                serie_name = getattr(s, "SERIE_NAME", "Bilinmiyor")
-                code = getattr(s, "SERIE_CODE", None)
-                if not code:
-                    continue
-
-                print(f"    • Seri: {serie_name} ({code})")
-                df_raw = safe_get_data(code, serie_name=serie_name, category=sub_name)
-                df = normalize_df(df_raw, code)
-                append_or_create_csv(
-                    series_name=serie_name,
-                    df=df,
-                    main_category=cat_name,
-                    sub_category=sub_name
-                )
-                time.sleep(SLEEP_BETWEEN_SERIES)
+    q = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    writer = threading.Thread(target=writer_loop, args=(q,), daemon=True)
+    writer.start()
+    try:
+        asyncio.run(fetch_all_data(tasks, date_range, load_series_state(), q))
+    finally:
+        q.put(None)
+        writer.join()
 
 # ---------- ANA ÇALIŞTIRMA ----------
 if __name__ == "__main__":
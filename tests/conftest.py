@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+import types
+
+# main.py kurulumda evdsAPI ile ağa bağlanır ve çalışma dizininde data/, logs/, state/
+# oluşturur. Testler yalnızca dosya işlemlerini kullandığından evdsAPI ağsız bir sınıfla
+# değiştirilir ve modül geçici bir dizinde içe aktarılır.
+os.environ.setdefault("EVDS_API_KEY", "test")
+
+
+class _OfflineEvdsAPI:
+    def __init__(self, key):
+        self.key = key
+        self.session = None
+
+
+_evds = types.ModuleType("evds")
+_evds.evdsAPI = _OfflineEvdsAPI
+sys.modules["evds"] = _evds
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="evds-datahub-tests-"))
@@ -0,0 +1,68 @@
+"""make_batches / fetch_batch toplu istek kontrolleri."""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+import main
+
+
+def test_batches_group_by_frequency_and_size(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_SIZE", 2)
+    series_df = pd.DataFrame({
+        "SERIE_NAME": ["A", "B", "C", "D", "Kodsuz"],
+        "SERIE_CODE": ["TP.A", "TP.B", "TP.C", "TP.D", ""],
+        "FREQUENCY_STR": ["GÜNLÜK", "AYLIK", "GÜNLÜK", "GÜNLÜK", "GÜNLÜK"],
+    })
+    assert main.make_batches(series_df) == [
+        [("A", "TP.A"), ("C", "TP.C")],
+        [("D", "TP.D")],
+        [("B", "TP.B")],
+    ]
+
+
+class FakeGetData:
+    """safe_get_data yerine geçen ağsız sahte; toplu istek `batch_status` ile yanıtlanır."""
+
+    def __init__(self, batch_status):
+        self.batch_status = batch_status
+        self.requests = []
+
+    async def __call__(self, client, sem, codes, date_range, **kwargs):
+        self.requests.append(codes)
+        if len(codes) > 1:
+            return None, self.batch_status
+        return pd.DataFrame({"Tarih": ["01-10-2025"], codes[0].replace(".", "_"): [1.0]}), 200
+
+
+@pytest.fixture
+def get_data(monkeypatch):
+    def install(batch_status):
+        fake = FakeGetData(batch_status)
+        monkeypatch.setattr(main, "safe_get_data", fake)
+        monkeypatch.setattr(main, "log_failed_series", lambda *args: None)
+        return fake
+    return install
+
+
+def fetch(batch):
+    return asyncio.run(main.fetch_batch(None, None, batch, ("01-10-2025", "02-10-2025"), "Alt"))
+
+
+BATCH = [("A", "TP.A"), ("B", "TP.B")]
+
+
+def test_client_error_splits_batch(get_data):
+    fake = get_data(400)
+    frames = fetch(BATCH)
+    assert fake.requests == [["TP.A", "TP.B"], ["TP.A"], ["TP.B"]]
+    assert list(frames) == ["TP.A", "TP.B"]
+    assert list(frames["TP.B"].columns) == ["Tarih", "TP_B"]
+
+
+@pytest.mark.parametrize("status", [429, 503, None])
+def test_limit_or_server_error_does_not_split_batch(get_data, status):
+    fake = get_data(status)
+    assert fetch(BATCH) == {}
+    assert fake.requests == [["TP.A", "TP.B"]]
@@ -0,0 +1,48 @@
+"""cached_catalog önbellek kontrolleri."""
+
+import itertools
+
+import pandas as pd
+
+import main
+
+_keys = itertools.count()
+
+
+def counting(rows, ttl=main.CATALOG_TTL):
+    """Her çağrıda `rows` tablosunu dönen ve çağrı sayısını tutan önbellekli fonksiyon kurar."""
+    calls = []
+
+    @main.cached_catalog(ttl)
+    def fetch(arg):
+        calls.append(arg)
+        return pd.DataFrame(rows)
+
+    return fetch, calls
+
+
+def test_cached_frame_matches_live_frame():
+    fetch, calls = counting({"SERIE_CODE": ["TP.A", "TP.B"], "END_DATE": ["2025-10-01", None]})
+    key = next(_keys)
+    live = fetch(key)
+    cached = fetch(key)
+    assert calls == [key]
+    pd.testing.assert_frame_equal(live, cached)
+    assert cached["END_DATE"].iat[1] is None
+    assert cached.attrs["fetched_at"] == live.attrs["fetched_at"]
+
+
+def test_expired_entry_is_refetched():
+    fetch, calls = counting({"SERIE_CODE": ["TP.A"]}, ttl=0)
+    key = next(_keys)
+    fetch(key)
+    fetch(key)
+    assert calls == [key, key]
+
+
+def test_empty_result_is_not_cached():
+    fetch, calls = counting({"SERIE_CODE": []})
+    key = next(_keys)
+    fetch(key)
+    fetch(key)
+    assert calls == [key, key]
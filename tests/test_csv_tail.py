@@ -0,0 +1,164 @@
+"""find_tail_offset / merge_sorted / append_or_create_csv kuyruk güncellemesi kontrolleri."""
+
+import os
+
+import pandas as pd
+import pytest
+
+import main
+
+
+def frame(rows):
+    """[("2025-10-01", 1.0), ...] satırlarından normalize_df çıktısı biçiminde DataFrame kurar."""
+    return pd.DataFrame({
+        "Tarih": pd.to_datetime([d for d, _ in rows], format="%Y-%m-%d"),
+        "TP_X": [v for _, v in rows],
+    })
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "UPDATE_MODE", True)
+    main._made_dirs.clear()
+    _, fname = main.series_path("Seri", "Ana", "Alt")
+    return fname
+
+
+def write_raw(fname, data):
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    with open(fname, "wb") as f:
+        f.write(data)
+
+
+def read_raw(fname):
+    with open(fname, "rb") as f:
+        return f.read()
+
+
+def update(df):
+    main.append_or_create_csv("Seri", df, "Ana", "Alt")
+
+
+def tail_offset(fname, since):
+    with open(fname, "rb") as f:
+        return main.find_tail_offset(f, since)
+
+
+# ---------- find_tail_offset ----------
+
+def test_offset_header_only(tmp_path):
+    fname = tmp_path / "s.csv"
+    fname.write_bytes(b"Tarih,TP_X\n")
+    assert tail_offset(fname, b"2025-10-01") == len(b"Tarih,TP_X\n")
+
+
+def test_offset_points_to_first_row_on_or_after_since(tmp_path):
+    fname = tmp_path / "s.csv"
+    fname.write_bytes(b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,2.0\n2025-10-03,3.0\n")
+    assert tail_offset(fname, b"2025-10-02") == len(b"Tarih,TP_X\n2025-10-01,1.0\n")
+    assert tail_offset(fname, b"2025-10-04") == fname.stat().st_size
+
+
+def test_offset_includes_line_without_trailing_newline(tmp_path):
+    fname = tmp_path / "s.csv"
+    fname.write_bytes(b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,2.0")
+    assert tail_offset(fname, b"2025-10-05") == len(b"Tarih,TP_X\n2025-10-01,1.0\n")
+
+
+def test_offset_crlf(tmp_path):
+    fname = tmp_path / "s.csv"
+    fname.write_bytes(b"Tarih,TP_X\r\n2025-10-01,1.0\r\n2025-10-02,2.0\r\n")
+    assert tail_offset(fname, b"2025-10-02") == len(b"Tarih,TP_X\r\n2025-10-01,1.0\r\n")
+
+
+# ---------- merge_sorted ----------
+
+def test_merge_sorted_dedupes_new_rows_last_wins():
+    old = frame([("2025-10-01", 1.0), ("2025-10-03", 3.0)])
+    new = frame([("2025-10-04", 4.0), ("2025-10-02", 2.0), ("2025-10-03", 30.0), ("2025-10-04", 40.0)])
+    merged = main.merge_sorted(old, new)
+    expected = frame([("2025-10-01", 1.0), ("2025-10-02", 2.0), ("2025-10-03", 30.0), ("2025-10-04", 40.0)])
+    pd.testing.assert_frame_equal(merged, expected, check_dtype=False)
+
+
+def test_merge_sorted_rejects_column_mismatch():
+    old = frame([("2025-10-01", 1.0)]).rename(columns={"TP_X": "TP_A"})
+    new = frame([("2025-10-02", 2.0)]).rename(columns={"TP_X": "TP_B"})
+    with pytest.raises(ValueError, match="uyuşmuyor"):
+        main.merge_sorted(old, new)
+
+
+# ---------- append_or_create_csv ----------
+
+def test_header_only_file_gets_rows_after_header(csv_path):
+    write_raw(csv_path, b"Tarih,TP_X\n")
+    update(frame([("2025-10-01", 1.0), ("2025-10-02", 2.0)]))
+    assert read_raw(csv_path) == b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,2.0\n"
+
+
+@pytest.mark.parametrize("data", [b"", b"Tarih,TP"])
+def test_file_without_complete_header_is_recreated(csv_path, data):
+    write_raw(csv_path, data)
+    update(frame([("2025-10-03", 3.0)]))
+    assert read_raw(csv_path) == b"Tarih,TP_X\n2025-10-03,3.0\n"
+
+
+def test_append_after_line_without_trailing_newline(csv_path):
+    write_raw(csv_path, b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,2.0")
+    update(frame([("2025-10-02", 2.0), ("2025-10-03", 3.0)]))
+    assert read_raw(csv_path) == b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,2.0\n2025-10-03,3.0\n"
+
+
+def test_crlf_file_is_updated(csv_path):
+    write_raw(csv_path, b"Tarih,TP_X\r\n2025-10-01,1.0\r\n2025-10-02,2.0\r\n")
+    update(frame([("2025-10-02", 20.0), ("2025-10-03", 3.0)]))
+    assert read_raw(csv_path) == b"Tarih,TP_X\r\n2025-10-01,1.0\r\n2025-10-02,20.0\r\n2025-10-03,3.0\r\n"
+
+
+def test_crlf_file_strict_append(csv_path):
+    write_raw(csv_path, b"Tarih,TP_X\r\n2025-10-01,1.0\r\n")
+    update(frame([("2025-10-02", 2.0)]))
+    assert read_raw(csv_path) == b"Tarih,TP_X\r\n2025-10-01,1.0\r\n2025-10-02,2.0\r\n"
+
+
+def test_revision_in_middle_of_tail_rewrites_only_tail(csv_path):
+    write_raw(csv_path, b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,2.0\n2025-10-03,3.0\n2025-10-04,4.0\n")
+    update(frame([("2025-10-02", 2.0), ("2025-10-03", 33.0), ("2025-10-04", 4.0), ("2025-10-05", 5.0)]))
+    assert read_raw(csv_path) == (
+        b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,2.0\n2025-10-03,33.0\n2025-10-04,4.0\n2025-10-05,5.0\n"
+    )
+
+
+def test_unchanged_window_leaves_file_untouched(csv_path):
+    data = b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,\n2025-10-03,1e-07\n"
+    write_raw(csv_path, data)
+    update(frame([("2025-10-02", float("nan")), ("2025-10-03", 1e-07)]))
+    assert read_raw(csv_path) == data
+
+
+def test_duplicate_dates_in_new_window_are_deduped(csv_path):
+    write_raw(csv_path, b"Tarih,TP_X\n2025-10-01,1.0\n")
+    update(frame([("2025-10-02", 2.0), ("2025-10-02", 22.0), ("2025-10-03", 3.0)]))
+    assert read_raw(csv_path) == b"Tarih,TP_X\n2025-10-01,1.0\n2025-10-02,22.0\n2025-10-03,3.0\n"
+
+
+@pytest.mark.parametrize("data", [b"Tarih,TP_A\n2025-10-01,1.0\n", b"Tarih,TP_A\n2025-10-03,1.0\n"])
+def test_header_mismatch_is_not_appended(csv_path, data):
+    write_raw(csv_path, data)
+    df = frame([("2025-10-02", 99.0)]).rename(columns={"TP_X": "TP_B"})
+    with pytest.raises(ValueError, match="uyuşmuyor"):
+        main.append_or_create_csv("Seri", df, "Ana", "Alt")
+    assert read_raw(csv_path) == data
+
+
+# ---------- pending_series ----------
+
+@pytest.mark.parametrize("data, pending", [(b"", True), (b"Tarih,TP", True), (b"Tarih,TP_X\n", False)])
+def test_full_mode_refetches_file_without_complete_header(csv_path, monkeypatch, data, pending):
+    monkeypatch.setattr(main, "UPDATE_MODE", False)
+    write_raw(csv_path, data)
+    series_df = pd.DataFrame({"SERIE_NAME": ["Seri"], "SERIE_CODE": ["TP.X"]})
+    keep, skipped = main.pending_series(series_df, "Ana", "Alt", {})
+    assert (len(keep) == 1) == pending
+    assert (skipped == [("Seri", "zaten mevcut")]) != pending
@@ -0,0 +1,31 @@
+"""normalize_batch toplu yanıt ayrıştırma kontrolleri."""
+
+import pandas as pd
+
+import main
+
+
+def test_batch_is_split_per_series():
+    df = pd.DataFrame({
+        "Tarih": ["01-10-2025", "02-10-2025", "geçersiz"],
+        "TP_A": [1.0, 2.0, 3.0],
+        "TP_B": [10.0, None, 30.0],
+    })
+    frames = main.normalize_batch(df, ["TP.A", "TP.B", "TP.C"])
+    dates = pd.to_datetime(["2025-10-01", "2025-10-02"])
+    assert list(frames["TP.A"].columns) == ["Tarih", "TP_A"]
+    assert list(frames["TP.A"]["Tarih"]) == list(dates)
+    assert list(frames["TP.A"]["TP_A"]) == [1.0, 2.0]
+    assert list(frames["TP.B"].columns) == ["Tarih", "TP_B"]
+    assert frames["TP.C"] is None
+
+
+def test_monthly_dates_are_parsed():
+    df = pd.DataFrame({"Tarih": ["2025-9", "2025-10"], "TP_A": [1.0, 2.0]})
+    frames = main.normalize_batch(df, ["TP.A"])
+    assert list(frames["TP.A"]["Tarih"]) == list(pd.to_datetime(["2025-09-01", "2025-10-01"]))
+
+
+def test_empty_or_dateless_batch_yields_none():
+    assert main.normalize_batch(pd.DataFrame(), ["TP.A"]) == {"TP.A": None}
+    assert main.normalize_batch(pd.DataFrame({"TP_A": [1.0]}), ["TP.A"]) == {"TP.A": None}
@@ -0,0 +1,62 @@
+"""RateLimiter duraklatma, başlık okuma ve hız toparlanma kontrolleri."""
+
+import asyncio
+import time
+
+import main
+
+
+def paused_for(limiter):
+    return limiter._paused_until - time.monotonic()
+
+
+def test_429_pause_holds_back_reserved_waiters():
+    limiter = main.RateLimiter(10)
+
+    async def run():
+        await limiter.wait()  # ilk token hemen alınır
+        waiter = asyncio.create_task(limiter.wait())  # sıra 0.1 sn sonrasına ayrılır
+        await asyncio.sleep(0)
+        start = time.monotonic()
+        limiter.observe(429, {"Retry-After": "0.3"})
+        await waiter
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.3
+
+
+def test_429_without_retry_after_backs_off_exponentially():
+    limiter = main.RateLimiter(1, backoff=1, max_backoff=10)
+    assert limiter.observe(429, {}, attempt=0) == 1
+    assert limiter.observe(429, {}, attempt=2) == 4
+    assert limiter.observe(429, {}, attempt=5) == 10
+
+
+def test_epoch_reset_is_read_as_absolute_time():
+    limiter = main.RateLimiter(1, max_backoff=60)
+    limiter.observe(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 5)})
+    assert 4 < paused_for(limiter) <= 5
+
+
+def test_epoch_reset_is_capped_at_max_backoff():
+    limiter = main.RateLimiter(1, max_backoff=2)
+    limiter.observe(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 86400)})
+    assert 0 < paused_for(limiter) <= 2
+
+
+def test_retry_after_is_capped_at_max_backoff():
+    limiter = main.RateLimiter(1, max_backoff=2)
+    assert limiter.observe(429, {"Retry-After": "86400"}) == 2
+    assert paused_for(limiter) <= 2
+
+
+def test_rate_recovers_after_successes():
+    limiter = main.RateLimiter(8, max_backoff=0)
+    limiter.observe(429, {})
+    limiter.observe(429, {})
+    assert limiter.rate == 2
+    limiter.observe(200, {})
+    assert limiter.rate == 3
+    for _ in range(10):
+        limiter.observe(200, {})
+    assert limiter.rate == 8
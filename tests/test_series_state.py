@@ -0,0 +1,53 @@
+"""is_up_to_date / pending_series güncelleme modu atlama kontrolleri."""
+
+import time
+
+import pandas as pd
+import pytest
+
+import main
+
+HOUR = 3600
+
+
+@pytest.fixture(autouse=True)
+def update_mode(monkeypatch):
+    monkeypatch.setattr(main, "UPDATE_MODE", True)
+
+
+def test_unknown_series_is_fetched():
+    assert not main.is_up_to_date("TP.X", "2025-10-01", time.time(), {})
+
+
+def test_recently_fetched_series_is_skipped():
+    state = {"TP.X": (time.time() - HOUR, None)}
+    assert main.is_up_to_date("TP.X", None, 0, state)
+
+
+@pytest.mark.parametrize("stamp, catalog_age, expected", [
+    ("2025-10-01", HOUR, True),       # taze liste, son tarih aynı
+    ("2025-10-02", HOUR, False),      # sunucuda yeni veri var
+    (None, HOUR, False),              # liste son tarih bildirmiyor
+    ("2025-10-01", 2 * 86400, False), # eski önbellek yeni veriyi gizleyemez
+])
+def test_stamp_is_trusted_only_from_fresh_catalog(stamp, catalog_age, expected):
+    now = time.time()
+    state = {"TP.X": (now - 3 * 86400, "2025-10-01")}
+    assert main.is_up_to_date("TP.X", stamp, now - catalog_age, state) == expected
+
+
+def test_pending_series_skips_up_to_date_series():
+    now = time.time()
+    series_df = pd.DataFrame({
+        "SERIE_NAME": ["Güncel", "Değişmiş", "Yeni"],
+        "SERIE_CODE": ["TP.A", "TP.B", "TP.C"],
+        "LAST_UPDATE_DATE": ["2025-10-01", "2025-10-02", "2025-10-01"],
+    })
+    series_df.attrs["fetched_at"] = now - HOUR
+    state = {
+        "TP.A": (now - 86400, "2025-10-01"),
+        "TP.B": (now - 86400, "2025-10-01"),
+    }
+    keep, skipped = main.pending_series(series_df, "Ana", "Alt", state)
+    assert list(keep["SERIE_CODE"]) == ["TP.B", "TP.C"]
+    assert skipped == [("Güncel", "güncel")]